@@ -1,10 +1,9 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
-import pytz
 
 try:
-    from ranker import get_schedule_with_stats, IST_TZ
+    from ranker import get_schedule_with_stats, clear_caches, IST_TZ
 except ImportError:
     st.error("Missing ranker.py")
     st.stop()
@@ -24,7 +23,9 @@ with st.sidebar:
     sel_date = st.date_input("Broadcast Date (IST)", value=today + timedelta(days=1))
     us_date = sel_date - timedelta(days=1)
     st.info(f"US Game Date: **{us_date.strftime('%b %d')}**")
-    if st.button("🔄 Refresh"): st.cache_data.clear()
+    if st.button("🔄 Refresh"):
+        clear_caches()
+        st.cache_data.clear()
 
 @st.cache_data(ttl=3600)
 def load_data(d): return get_schedule_with_stats(d)
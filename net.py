@@ -0,0 +1,114 @@
+import os
+import json
+import stat
+import time
+import logging
+import hashlib
+import tempfile
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+log = logging.getLogger(__name__)
+
+# --- JSON CODEC ---
+# orjson is an optional speed-up for the multi-MB schedule feed; stdlib otherwise.
+# dumps returns compact UTF-8 bytes either way.
+try:
+    from orjson import loads, dumps
+except ImportError:
+    from json import loads
+    def dumps(obj): return json.dumps(obj, separators=(',', ':')).encode()
+
+# --- SHARED HTTP SESSION ---
+# One pooled session per process so repeat calls (Streamlit reruns, odds + CDN)
+# reuse TCP/TLS connections instead of paying a fresh handshake every time.
+SESSION = requests.Session()
+SESSION.headers.update({'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'})
+# Room for every concurrent fetch in the ranker's thread pool; retry transient blips
+SESSION.mount('https://', HTTPAdapter(pool_connections=8, pool_maxsize=8,
+                                      max_retries=Retry(total=2, backoff_factor=0.2,
+                                                        status_forcelist=(502, 503, 504),
+                                                        raise_on_status=False)))
+
+def get(url, **kwargs):
+    return SESSION.get(url, **kwargs)
+
+# --- DISK CACHE ---
+# Per-user 0700 directory: a predictable name straight in the shared temp dir would let
+# another local user plant a 'fresh' schedule for us to serve. Windows' temp dir is already per-user.
+CACHE_DIR = (os.path.join(tempfile.gettempdir(), f'lpr-{os.getuid()}') if hasattr(os, 'getuid')
+             else tempfile.gettempdir())
+_CACHE_OK = None
+
+def _cache_dir_ok():
+    # Set up CACHE_DIR on first use, not at import; if it can't be made private to us
+    # (name taken by a file, a symlink or another user) disk caching is simply off
+    global _CACHE_OK
+    if _CACHE_OK is None:
+        try:
+            os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+            st = os.lstat(CACHE_DIR)
+            _CACHE_OK = not hasattr(os, 'getuid') or (stat.S_ISDIR(st.st_mode) and st.st_uid == os.getuid())
+            if _CACHE_OK and hasattr(os, 'getuid') and st.st_mode & 0o077: os.chmod(CACHE_DIR, 0o700)
+        except OSError:
+            _CACHE_OK = False
+    return _CACHE_OK
+
+def _write_atomic(path, body):
+    # Write-then-rename so a concurrent reader never sees a half-written file
+    fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, prefix='lpr_')
+    try:
+        with os.fdopen(fd, 'wb') as f: f.write(body)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+def _cache_path(url):
+    return os.path.join(CACHE_DIR, 'lpr_' + hashlib.sha1(url.encode()).hexdigest())
+
+def cached_at(url):
+    """When url's cached copy was last fetched or revalidated (epoch seconds), or None if there is none."""
+    if not _cache_dir_ok(): return None
+    try: return os.path.getmtime(_cache_path(url))
+    except OSError: return None
+
+def expire(url):
+    """Mark url's cached copy stale so the next cached_get revalidates it (a 304 if unchanged)."""
+    if not _cache_dir_ok(): return
+    try: os.utime(_cache_path(url), (0, 0))
+    except FileNotFoundError: pass
+
+def cached_get(url, ttl, **kwargs):
+    """Response body for url, served from a temp-dir copy while it is younger than ttl seconds."""
+    if not _cache_dir_ok():
+        r = get(url, **kwargs)
+        r.raise_for_status()
+        return r.content
+    path = _cache_path(url)
+    meta_path = path + '.meta'
+    headers = dict(kwargs.pop('headers', None) or {})
+    if os.path.exists(path):
+        if time.time() - os.path.getmtime(path) < ttl:
+            with open(path, 'rb') as f: return f.read()
+        # Stale: revalidate with the stored ETag / Last-Modified so an unchanged feed is a 304
+        try:
+            with open(meta_path, 'rb') as f: headers.update(loads(f.read()))
+        except (OSError, ValueError): pass
+
+    r = get(url, headers=headers, **kwargs)
+    if r.status_code == 304 and os.path.exists(path):
+        os.utime(path)  # restart the TTL window
+        with open(path, 'rb') as f: return f.read()
+    r.raise_for_status()
+    validators = {}
+    if r.headers.get('ETag'): validators['If-None-Match'] = r.headers['ETag']
+    if r.headers.get('Last-Modified'): validators['If-Modified-Since'] = r.headers['Last-Modified']
+    try:
+        _write_atomic(path, r.content)
+        _write_atomic(meta_path, dumps(validators))
+    except OSError as e:
+        # The body is already in hand: a full or unwritable disk only costs us the cache
+        log.warning("Could not cache %s: %s", url, e)
+    return r.content
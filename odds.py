@@ -1,13 +1,16 @@
-import requests
+import logging
+import net
 from config import ODDS_API_KEY, TEAM_NAME_MAP
 
+log = logging.getLogger(__name__)
+
 def get_betting_spreads():
     """
     Fetches NBA spreads from The Odds API.
     Returns a dictionary: {'LAL': -5.5, 'GSW': 5.5, ...}
     """
     if "PASTE_YOUR" in ODDS_API_KEY:
-        print("⚠️ PLEASE UPDATE YOUR ODDS_API_KEY IN CONFIG.PY")
+        log.warning("PLEASE UPDATE YOUR ODDS_API_KEY IN CONFIG.PY")
         return {}
 
     # API Endpoint for NBA Spreads
@@ -19,14 +22,14 @@ def get_betting_spreads():
         'oddsFormat': 'decimal'
     }
 
-    print("💰 Fetching Betting Odds...")
-    response = requests.get(url, params=params)
+    log.info("Fetching betting odds")
+    response = net.get(url, params=params, timeout=10)
     
     if response.status_code != 200:
-        print(f"❌ Failed to get odds: {response.status_code}")
+        log.warning("Failed to get odds: %s", response.status_code)
         return {}
 
-    data = response.json()
+    data = net.loads(response.content)
     spread_dict = {}
 
     for game in data:
@@ -56,4 +59,5 @@ def get_betting_spreads():
 
 # Test it directly
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     print(get_betting_spreads())
\ No newline at end of file
@@ -1,9 +1,11 @@
+import os
+import tempfile
 import pandas as pd
-import json
-import requests
-from bs4 import BeautifulSoup
+import net
+import lxml.html
 from nba_api.stats.endpoints import leaguedashplayerstats, leaguedashteamstats
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 # --- CONFIG ---
 # We use official NBA headers because this runs LOCALLY (Unblocked)
@@ -13,13 +15,9 @@ HEADERS = {
 }
 CURRENT_SEASON = '2025-26' # Make sure this matches the API's current season ID
 
-def fetch_live_nba_stats():
-    print("🚀 Starting Data Update...")
-    
-    data = {}
-    
-    # 1. TEAM STATS (Net Rating, Pace)
-    print("📊 Fetching Team Stats (Official NBA API)...")
+# 1. TEAM STATS (Net Rating, Pace)
+def fetch_team_stats(say=print):
+    say("📊 Fetching Team Stats (Official NBA API)...")
     try:
         teams = leaguedashteamstats.LeagueDashTeamStats(
             season=CURRENT_SEASON,
@@ -27,22 +25,18 @@ def fetch_live_nba_stats():
             timeout=30
         ).get_data_frames()[0]
         
-        team_data = {}
-        for _, row in teams.iterrows():
-            abbr = row['TEAM_ABBREVIATION']
-            team_data[abbr] = {
-                'net_rating': row['E_NET_RATING'],
-                'pace': row['E_PACE'],
-                'w_pct': row['W_PCT']
-            }
-        data['teams'] = team_data
-        print(f"   ✅ Indexed {len(team_data)} teams.")
+        team_data = (teams.set_index('TEAM_ABBREVIATION')[['E_NET_RATING', 'E_PACE', 'W_PCT']]
+                     .rename(columns={'E_NET_RATING': 'net_rating', 'E_PACE': 'pace', 'W_PCT': 'w_pct'})
+                     .to_dict('index'))
+        say(f"   ✅ Indexed {len(team_data)} teams.")
+        return team_data
     except Exception as e:
-        print(f"   ❌ Team Stats Failed: {e}")
-        data['teams'] = {}
+        say(f"   ❌ Team Stats Failed: {e}")
+        return {}
 
-    # 2. PLAYER STATS (Fantasy Points)
-    print("⛹️ Fetching Player Stats...")
+# 2. PLAYER STATS (Fantasy Points)
+def fetch_player_stats(say=print):
+    say("⛹️ Fetching Player Stats...")
     try:
         players = leaguedashplayerstats.LeagueDashPlayerStats(
             season=CURRENT_SEASON,
@@ -50,55 +44,73 @@ def fetch_live_nba_stats():
             timeout=30
         ).get_data_frames()[0]
         
-        player_data = {}
-        for _, row in players.iterrows():
-            name = row['PLAYER_NAME']
-            # FP Formula: PTS + 1.2*REB + 1.5*AST + 3*STL + 3*BLK - 1*TOV
-            fp = (row['PTS']) + (row['REB']*1.2) + (row['AST']*1.5) + \
-                 (row['STL']*3) + (row['BLK']*3) - (row['TOV'])
-            gp = row['GP'] if row['GP'] > 0 else 1
-            
-            # Organize by Team so we don't need complex mapping later
-            team = row['TEAM_ABBREVIATION']
-            if team not in player_data: player_data[team] = []
-            
-            player_data[team].append({
-                'name': name,
-                'fp': round(fp / gp, 1)
-            })
-            
-        # Sort rosters
-        for t in player_data:
-            player_data[t].sort(key=lambda x: x['fp'], reverse=True)
+        # FP Formula: PTS + 1.2*REB + 1.5*AST + 3*STL + 3*BLK - 1*TOV, per game played
+        fp = players['PTS'] + players['REB']*1.2 + players['AST']*1.5 + \
+             players['STL']*3 + players['BLK']*3 - players['TOV']
+        # Python's round per value: Series.round rints FP*10, which sends 42.45 to 42.4
+        players['FP'] = [round(x, 1) for x in (fp / players['GP'].clip(lower=1)).tolist()]
+        # Sort once, best-first, so any per-team slice comes out already ordered
+        players = players.sort_values('FP', ascending=False, kind='stable')
+        
+        # Columnar: parallel name/team/fp arrays, loadable with pd.DataFrame(data['players'])
+        player_data = {
+            'name': players['PLAYER_NAME'].tolist(),
+            'team': players['TEAM_ABBREVIATION'].tolist(),
+            'fp': players['FP'].tolist()
+        }
             
-        data['players'] = player_data
-        print(f"   ✅ Indexed {len(players)} players.")
+        say(f"   ✅ Indexed {len(players)} players.")
+        return player_data
     except Exception as e:
-        print(f"   ❌ Player Stats Failed: {e}")
-        data['players'] = {}
+        say(f"   ❌ Player Stats Failed: {e}")
+        return {'name': [], 'team': [], 'fp': []}
 
-    # 3. AVAILABILITY (Rotowire)
-    print("🚑 Fetching Active Players (Rotowire)...")
+# 3. AVAILABILITY (Rotowire)
+def fetch_active_players(say=print):
+    say("🚑 Fetching Active Players (Rotowire)...")
     try:
-        r = requests.get("https://www.rotowire.com/basketball/nba-lineups.php", headers=HEADERS)
-        soup = BeautifulSoup(r.text, 'html.parser')
-        active_players = []
-        for box in soup.find_all(class_="lineup__box"):
-            for p in box.find_all("a", {"title": True}):
-                active_players.append(p['title'].strip())
+        r = net.get("https://www.rotowire.com/basketball/nba-lineups.php", headers=HEADERS, timeout=30)
+        tree = lxml.html.fromstring(r.content)
+        # One XPath pass: every titled player link inside a lineup box
+        active_players = [a.get('title').strip() for a in tree.xpath(
+            '//*[contains(concat(" ", normalize-space(@class), " "), " lineup__box ")]//a[@title]')]
         
-        data['active_players'] = active_players
-        print(f"   ✅ Found {len(active_players)} active players.")
+        say(f"   ✅ Found {len(active_players)} active players.")
+        return active_players
     except Exception as e:
-        print(f"   ❌ Rotowire Failed: {e}")
-        data['active_players'] = []
+        say(f"   ❌ Rotowire Failed: {e}")
+        return []
+
+def fetch_live_nba_stats():
+    print("🚀 Starting Data Update...")
+    
+    # The three sources are independent network calls: run them side by side.
+    # Each one reports into its own buffer, replayed in order so every status line stays under its heading.
+    with ThreadPoolExecutor(max_workers=3) as ex:
+        team_log, player_log, active_log = [], [], []
+        f_teams = ex.submit(fetch_team_stats, team_log.append)
+        f_players = ex.submit(fetch_player_stats, player_log.append)
+        f_active = ex.submit(fetch_active_players, active_log.append)
+        data = {}
+        for key, future, lines in (('teams', f_teams, team_log), ('players', f_players, player_log),
+                                   ('active_players', f_active, active_log)):
+            data[key] = future.result()
+            for line in lines: print(line)
         
     # 4. TIMESTAMP
     data['last_updated'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
-    # SAVE TO FILE
-    with open('nba_data.json', 'w') as f:
-        json.dump(data, f)
+    # SAVE TO FILE (write-then-rename so a reader never sees a half-written file)
+    fd, tmp = tempfile.mkstemp(dir='.', prefix='nba_data.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(net.dumps(data))
+        os.chmod(tmp, 0o644)  # mkstemp creates 0600; keep the file readable like a plain open() would
+        os.replace(tmp, 'nba_data.json')
+    except BaseException:
+        # Don't leave a stray temp file for the workflow's git step to pick up
+        os.unlink(tmp)
+        raise
     
     print("\n✅ SUCCESS! Data saved to 'nba_data.json'")
 